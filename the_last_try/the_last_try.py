@@ -5,18 +5,6 @@ from __future__ import annotations
 import argparse
 import sys
 
-from rich.console import Console
-
-from core.engine import Engine
-from core.utils import (
-    load_payloads,
-    load_user_agents,
-    print_branding,
-    validate_here_marker,
-)
-
-console = Console()
-
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
@@ -62,6 +50,11 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("--timeout", type=int, default=10, help="Request/page timeout in seconds")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Browser-check every reflection, including ones whose tags are encoded",
+    )
     return parser
 
 
@@ -69,6 +62,18 @@ def main() -> int:
     parser = build_parser()
     args = parser.parse_args()
 
+    # Only rich and the light helpers load before input is validated; the engine
+    # (requests, playwright) is imported once the arguments are known to be usable.
+    from rich.console import Console
+
+    from core.utils import (
+        load_payloads,
+        load_user_agents,
+        print_branding,
+        validate_here_marker,
+    )
+
+    console = Console()
     print_branding()
 
     try:
@@ -91,6 +96,8 @@ def main() -> int:
         console.print("[red]--timeout must be >= 1[/red]")
         return 1
 
+    from core.engine import Engine
+
     engine = Engine(
         target_url=args.target_url,
         payloads=payloads,
@@ -103,6 +110,7 @@ def main() -> int:
         headless=args.headless,
         output_file=args.output,
         verbose=args.verbose,
+        strict=args.strict,
     )
 
     try: